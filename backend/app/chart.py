@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import math
 import os
-from typing import Dict, List, Tuple, Optional, Any
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Tuple, Optional, Any, Sequence
 
+import numpy as np
 import swisseph as swe
 
+# numba opsiyonel: yoksa aspect taraması NumPy yoluna düşer
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover
+    njit = None
+
 # ----------------------------
 # EPHEMERIS PATH (SAFE)
 # ----------------------------
@@ -40,11 +50,23 @@ EXTRA_BODIES: Dict[str, int] = {
     "Lilith": swe.MEAN_APOG,  # Mean Black Moon
 }
 
+# compute_all_bodies sırası: önce PLANETS, sonra extras (her çağrıda merge yapılmasın)
+MERGED_BODIES: Tuple[Tuple[str, int], ...] = tuple({**PLANETS, **EXTRA_BODIES}.items())
+MERGED_NAMES: Tuple[str, ...] = tuple(name for name, _ in MERGED_BODIES)
+MERGED_PIDS: Tuple[int, ...] = tuple(pid for _, pid in MERGED_BODIES)
+
+_FLG_SWIEPH = swe.FLG_SWIEPH
+_FLG_MOSEPH = swe.FLG_MOSEPH
+
 SIGNS = [
     "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
     "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces",
 ]
 
+# Tam dereceden burca lookup (0..359) + batch yolu için array hali
+_SIGN_BY_INT_DEG: Tuple[str, ...] = tuple(SIGNS[i // 30] for i in range(360))
+SIGNS_ARR = np.array(SIGNS)
+
 ASPECTS = {
     "Conjunction": 0,
     "Opposition": 180,
@@ -61,6 +83,25 @@ DEFAULT_ORBS = {
     "Sextile": 4.0,
 }
 
+# Aspect tablosu array olarak (vektörel orb hesabı için), ASPECTS ile aynı sırada
+ASPECT_NAMES: Tuple[str, ...] = tuple(ASPECTS)
+ASPECT_DEGS = np.array([ASPECTS[n] for n in ASPECT_NAMES], dtype=np.float64)
+ORBS = np.array([DEFAULT_ORBS[n] for n in ASPECT_NAMES], dtype=np.float64)
+
+# (sign_j - sign_i) % 12 -> ulaşılabilir aspect'lerin bitmask'i (bit k = ASPECT_NAMES[k]).
+# Orb'lar 30°'den küçük olduğu için iki burç arası fark fd ise ayrım ((fd-1)*30, (fd+1)*30)
+# aralığında; bu aralığa orb'u ile değemeyen aspect'ler hiç denenmez (burç dışı aspect'ler korunur).
+_ASPECT_MASK_BY_SIGNDIFF = np.array([
+    sum(
+        1 << k for k in range(len(ASPECT_NAMES))
+        if abs(30.0 * min(diff, 12 - diff) - ASPECT_DEGS[k]) < 30.0 + ORBS[k]
+    )
+    for diff in range(12)
+], dtype=np.int64)
+
+# Cusp'ları ekliptik sırada olan (quadrant) sistemler: ev = boylamın düştüğü cusp aralığı
+QUADRANT_HOUSE_SYSTEMS = frozenset(b"PKORCBTU")
+
 MAJOR_PLANET_NAMES = [
     "Sun", "Moon", "Mercury", "Venus", "Mars",
     "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto",
@@ -71,18 +112,19 @@ MAJOR_PLANET_NAMES = [
 # ----------------------------
 
 def wrap360(deg: float) -> float:
-    d = deg % 360.0
-    return d + 360.0 if d < 0 else d
+    return deg - 360.0 * math.floor(deg / 360.0)
 
 def angular_separation(a: float, b: float) -> float:
-    d = abs(wrap360(a) - wrap360(b))
-    return min(d, 360.0 - d)
+    d = abs(a - b) % 360.0
+    return 360.0 - d if d > 180.0 else d
+
+# aspect kernel'i içinde inline edilen kopya (numba yoksa düz Python fonksiyonu)
+_angular_separation = njit(inline="always")(angular_separation) if njit is not None else angular_separation
 
 def deg_to_sign(deg: float) -> Tuple[str, float]:
     deg = wrap360(deg)
-    sign_idx = int(deg // 30)
-    within = deg - 30 * sign_idx
-    return SIGNS[sign_idx], within
+    idx = int(deg)
+    return _SIGN_BY_INT_DEG[idx], deg - 30 * (idx // 30)
 
 def opposite_deg(x: float) -> float:
     return wrap360(x + 180.0)
@@ -92,149 +134,318 @@ def to_julian_day_ut(year: int, month: int, day: int, hour: int, minute: int, tz
     h_ut = h_local - tz_offset_hours
     return swe.julday(year, month, day, h_ut, swe.GREG_CAL)
 
+_HS_PLACIDUS = b"P"
+
+@lru_cache(maxsize=16)
 def _hs_bytes(house_system: str) -> bytes:
-    hs = (house_system or "P")[0].encode("ascii", errors="ignore")
-    return hs if len(hs) == 1 else b"P"
+    if house_system in (None, "", "P"):
+        return _HS_PLACIDUS
+    hs = house_system[0].encode("ascii", errors="ignore")
+    return hs if len(hs) == 1 else _HS_PLACIDUS
 
-def _safe_calc_ut(jd_ut: float, pid: int) -> Optional[Tuple[List[float], int]]:
+def set_ephe_path(path: str) -> None:
     """
-    Önce SWIEPH (dosyalı) dener.
-    Ephe dosyası yoksa MOSEPH (dosyasız) dener.
-    Yine olmazsa None döner.
+    Ephemeris yolunu değiştirir; eski yolla hesaplanmış calc_ut cache'i temizlenir.
     """
+    global EPHE_PATH
+    EPHE_PATH = path
+    swe.set_ephe_path(path)
+    _calc_ut_cached.cache_clear()
+    _compute_natal_chart_cached.cache_clear()
+
+@lru_cache(maxsize=4096)
+def _calc_ut_cached(jd_ut: float, pid: int, ephe_path: str) -> Optional[Tuple[List[float], int]]:
+    # ephe_path sadece cache anahtarı için (yol değişince eski sonuçlar kullanılmaz)
     try:
-        xx, retflag = swe.calc_ut(jd_ut, pid, swe.FLG_SWIEPH)
+        xx, retflag = swe.calc_ut(jd_ut, pid, _FLG_SWIEPH)
         return xx, retflag
     except swe.Error:
         # dosya yoksa / bulunamazsa: MOSEPH fallback (major planets için çok işe yarar)
         try:
-            xx, retflag = swe.calc_ut(jd_ut, pid, swe.FLG_MOSEPH)
+            xx, retflag = swe.calc_ut(jd_ut, pid, _FLG_MOSEPH)
             return xx, retflag
         except swe.Error:
             return None
 
+def _safe_calc_ut(jd_ut: float, pid: int) -> Optional[Tuple[List[float], int]]:
+    """
+    Önce SWIEPH (dosyalı) dener.
+    Ephe dosyası yoksa MOSEPH (dosyasız) dener.
+    Yine olmazsa None döner.
+    Sonuçlar (jd_ut, pid) için cache'lenir; aynı JD tekrar hesaplanmaz.
+    """
+    return _calc_ut_cached(jd_ut, pid, EPHE_PATH)
+
+def _calc_many(jd_ut: float, pids: Sequence[int]) -> Dict[int, Optional[Tuple[List[float], int]]]:
+    calc = _safe_calc_ut
+    return {pid: calc(jd_ut, pid) for pid in pids}
+
 # ----------------------------
 # COMPUTE BODIES / HOUSES
 # ----------------------------
 
-def compute_all_bodies(jd_ut: float) -> Dict[str, Dict[str, Any]]:
+@dataclass
+class BodyTable:
     """
-    Planets + extras. Ephe dosyası yoksa bazı extras (örn. Chiron) otomatik skip edilir.
+    Gök cisimleri kolon bazlı (SoA): her alan MERGED_BODIES sırasında bir float64 array.
+    Eksik değerler NaN; legacy dict şekli sadece API sınırında (to_dicts) üretilir.
     """
-    bodies: Dict[str, Dict[str, Any]] = {}
-    merged: Dict[str, int] = {}
-    merged.update(PLANETS)
-    merged.update(EXTRA_BODIES)
+    names: Tuple[str, ...]
+    lon: np.ndarray
+    lat: np.ndarray
+    lon_speed: np.ndarray
+    available: np.ndarray
+    house_pos: np.ndarray
+    name_to_idx: Dict[str, int] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.name_to_idx = {n: i for i, n in enumerate(self.names)}
+
+    def value(self, name: str, column: str) -> Optional[float]:
+        i = self.name_to_idx.get(name)
+        if i is None or not self.available[i]:
+            return None
+        v = float(getattr(self, column)[i])
+        return None if math.isnan(v) else v
+
+    def to_dicts(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for i, name in enumerate(self.names):
+            if not self.available[i]:
+                out[name] = {
+                    "available": False,
+                    "lon": None,
+                    "lat": None,
+                    "sign": None,
+                    "deg_in_sign": None,
+                    "lon_speed": None,
+                    "house": None,
+                    "house_pos": None,
+                }
+                continue
+
+            lon = float(self.lon[i])
+            sign, within = deg_to_sign(lon)
+            hpos = float(self.house_pos[i])
+            out[name] = {
+                "available": True,
+                "lon": lon,
+                "lat": float(self.lat[i]),
+                "sign": sign,
+                "deg_in_sign": float(within),
+                "lon_speed": float(self.lon_speed[i]),
+                "house": None if math.isnan(hpos) else int(hpos),
+                "house_pos": None if math.isnan(hpos) else hpos,
+            }
+        return out
 
-    for name, pid in merged.items():
-        res = _safe_calc_ut(jd_ut, pid)
+def compute_all_bodies(jd_ut: float) -> BodyTable:
+    """
+    Planets + extras. Ephe dosyası yoksa bazı extras (örn. Chiron) otomatik skip edilir
+    (available=False, değerler NaN).
+    """
+    n = len(MERGED_BODIES)
+    lon = np.full(n, np.nan)
+    lat = np.full(n, np.nan)
+    lon_speed = np.full(n, np.nan)
+    available = np.zeros(n, dtype=bool)
+
+    results = _calc_many(jd_ut, MERGED_PIDS)
+    for i, pid in enumerate(MERGED_PIDS):
+        res = results[pid]
         if res is None:
             # Crash yok: sadece işaretle/skip
-            bodies[name] = {
-                "available": False,
-                "lon": None,
-                "lat": None,
-                "sign": None,
-                "deg_in_sign": None,
-                "lon_speed": None,
-            }
             continue
-
         xx, _ = res
-        lon, lat, lon_speed = float(xx[0]), float(xx[1]), float(xx[3])
-        lon = wrap360(lon)
-        sign, within = deg_to_sign(lon)
+        lon[i], lat[i], lon_speed[i] = xx[0], xx[1], xx[3]
+        available[i] = True
+
+    return BodyTable(
+        names=MERGED_NAMES,
+        lon=lon % 360.0,
+        lat=lat,
+        lon_speed=lon_speed,
+        available=available,
+        house_pos=np.full(n, np.nan),
+    )
 
-        bodies[name] = {
-            "available": True,
-            "lon": lon,
-            "lat": lat,
-            "sign": sign,
-            "deg_in_sign": float(within),
-            "lon_speed": lon_speed,
-        }
+def compute_bodies_batch(jd_uts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Çok sayıda JD için (transit / progresyon taraması) tüm gök cisimleri, kolon bazlı.
+    Her array (len(MERGED_NAMES), len(jd_uts)) şeklinde; satırlar MERGED_NAMES sırasında.
+    Hesaplanamayan değerler NaN, sign_idx -1, sign "".
+    """
+    jds = np.asarray(jd_uts, dtype=np.float64).ravel()
+    shape = (len(MERGED_PIDS), jds.shape[0])
+    lon = np.full(shape, np.nan)
+    lat = np.full(shape, np.nan)
+    lon_speed = np.full(shape, np.nan)
+
+    # swe.calc_ut skaler; cache'i atlıyoruz (tek seferlik binlerce JD, LRU'yu boşaltmasın)
+    calc = _calc_ut_cached.__wrapped__
+    ephe = EPHE_PATH
+    jd_list = jds.tolist()
+    for b, pid in enumerate(MERGED_PIDS):
+        for t, jd in enumerate(jd_list):
+            res = calc(jd, pid, ephe)
+            if res is None:
+                continue
+            xx = res[0]
+            lon[b, t], lat[b, t], lon_speed[b, t] = xx[0], xx[1], xx[3]
+
+    available = ~np.isnan(lon)
+    lon %= 360.0
+    sign_idx = np.where(available, lon // 30.0, -1).astype(np.int8)
+    deg_in_sign = lon - 30.0 * sign_idx
+    sign = np.where(available, np.take(SIGNS_ARR, sign_idx.astype(np.int64)), "")
 
-    return bodies
+    return {
+        "jd_ut": jds,
+        "lon": lon,
+        "lat": lat,
+        "lon_speed": lon_speed,
+        "available": available,
+        "sign_idx": sign_idx,
+        "sign": sign,
+        "deg_in_sign": deg_in_sign,
+    }
 
-def compute_houses(jd_ut: float, latitude: float, longitude: float, house_system: str = "P") -> Dict[str, object]:
-    hs = _hs_bytes(house_system)
-    cusps, ascmc = swe.houses(jd_ut, latitude, longitude, hs)
+def compute_houses(
+    jd_ut: float,
+    latitude: float,
+    longitude: float,
+    house_system: str = "P",
+    precomputed: Optional[Tuple[Any, Any]] = None,
+) -> Dict[str, object]:
+    """
+    precomputed: aynı girdiyle daha önce alınmış swe.houses (cusps, ascmc) sonucu.
+    """
+    if precomputed is None:
+        precomputed = swe.houses(jd_ut, latitude, longitude, _hs_bytes(house_system))
+    cusps, ascmc = precomputed
 
-    cusp_list = (
-        [wrap360(float(c)) for c in cusps[1:13]] if len(cusps) >= 13
-        else [wrap360(float(c)) for c in cusps[:12]]
-    )
+    # swe.houses zaten [0, 360) float döner; tek bir vektörel mod sadece güvence için
+    raw = cusps[1:13] if len(cusps) >= 13 else cusps[:12]
+    cusp_list = (np.asarray(raw, dtype=np.float64) % 360.0).tolist()
 
-    asc = wrap360(float(ascmc[0])) if len(ascmc) > 0 else None
-    mc = wrap360(float(ascmc[1])) if len(ascmc) > 1 else None
+    asc, mc = ascmc[0], ascmc[1]
 
     return {"cusps": cusp_list, "ascendant": asc, "midheaven": mc}
 
+def _house_pos_from_cusps(lons: np.ndarray, cusps: List[float]) -> np.ndarray:
+    """
+    12 cusp'a göre house_pos (1.0 <= x < 13.0): tam kısım ev, kesir kısım ev içindeki oran.
+    """
+    cusps_arr = np.asarray(cusps, dtype=np.float64)
+    offsets = np.append((cusps_arr - cusps_arr[0]) % 360.0, 360.0)
+    offset = (lons - cusps_arr[0]) % 360.0
+    house = np.searchsorted(offsets[:12], offset, side="right")
+    start = offsets[house - 1]
+    return house + (offset - start) / (offsets[house] - start)
+
+def _house_pos_swe(
+    jd_ut: float,
+    latitude: float,
+    armc: float,
+    hs: bytes,
+    lons: Sequence[float],
+    lats: Sequence[float],
+) -> np.ndarray:
+    """
+    swe.house_pos(armc, geolat, eps, (lon, lat), hsys) ile ev pozisyonları; eps = gerçek eğiklik.
+    Hesaplanamayan değerler NaN.
+    """
+    out = np.full(len(lons), np.nan)
+    eps_res = _safe_calc_ut(jd_ut, swe.ECL_NUT)
+    if eps_res is None:
+        return out
+    eps = float(eps_res[0][0])
+
+    for k, (lon, lat) in enumerate(zip(lons, lats)):
+        try:
+            out[k] = swe.house_pos(armc, latitude, eps, (float(lon), float(lat)), hs)
+        except swe.Error:
+            pass
+    return out
+
 def compute_planet_houses(
     jd_ut: float,
     latitude: float,
     longitude: float,
     house_system: str,
-    bodies: Dict[str, Dict[str, Any]]
+    bodies: BodyTable,
+    cusps: Optional[List[float]] = None,
+    armc: Optional[float] = None,
 ) -> None:
+    """
+    bodies.house_pos'u doldurur.
+    cusps verilirse (compute_houses çıktısı) quadrant sistemlerde ev, cusp aralığından bulunur;
+    aksi halde her gök cismi için swe.house_pos çağrılır (armc yoksa swe.houses'tan alınır).
+    """
     hs = _hs_bytes(house_system)
 
-    for name, d in bodies.items():
-        if not d.get("available") or d.get("lon") is None:
-            d["house"] = None
-            d["house_pos"] = None
-            continue
+    bodies.house_pos = np.full(len(bodies.names), np.nan)
+    idx = np.flatnonzero(bodies.available)
+    if idx.size == 0:
+        return
 
-        lon = float(d["lon"])
-        lat = float(d.get("lat") or 0.0)
+    if cusps is not None and len(cusps) == 12 and hs[0] in QUADRANT_HOUSE_SYSTEMS:
+        bodies.house_pos[idx] = _house_pos_from_cusps(bodies.lon[idx], cusps)
+        return
 
-        try:
-            hpos = swe.house_pos(jd_ut, latitude, longitude, hs, lon, lat)
-        except Exception:
-            hpos = None
-
-        if hpos is None:
-            d["house"] = None
-            d["house_pos"] = None
-        else:
-            d["house_pos"] = float(hpos)
-            d["house"] = int(float(hpos))
+    if armc is None:
+        armc = swe.houses(jd_ut, latitude, longitude, hs)[1][2]
+    bodies.house_pos[idx] = _house_pos_swe(jd_ut, latitude, armc, hs, bodies.lon[idx].tolist(), bodies.lat[idx].tolist())
 
 def compute_angles_and_points(
     jd_ut: float,
     latitude: float,
     longitude: float,
     house_system: str = "P",
+    precomputed: Optional[Tuple[Any, Any]] = None,
+    bodies: Optional[BodyTable] = None,
 ) -> Dict[str, Dict[str, float]]:
+    """
+    precomputed: swe.houses (cusps, ascmc) sonucu (varsa tekrar hesaplanmaz).
+    bodies: compute_all_bodies çıktısı; Sun/Moon buradan alınır, yeniden calc_ut yapılmaz.
+    """
     hs = _hs_bytes(house_system)
-    cusps, ascmc = swe.houses(jd_ut, latitude, longitude, hs)
+    if precomputed is None:
+        precomputed = swe.houses(jd_ut, latitude, longitude, hs)
+    cusps, ascmc = precomputed
 
-    asc = wrap360(float(ascmc[0])) if len(ascmc) > 0 else None
-    mc = wrap360(float(ascmc[1])) if len(ascmc) > 1 else None
-    vertex = wrap360(float(ascmc[3])) if len(ascmc) > 3 else None
+    # ascmc: asc, mc, armc, vertex, ... (hepsi [0, 360) aralığında)
+    asc, mc, armc, vertex, *_ = ascmc
 
-    dsc = opposite_deg(asc) if asc is not None else None
-    ic = opposite_deg(mc) if mc is not None else None
+    dsc = opposite_deg(asc)
+    ic = opposite_deg(mc)
 
     # Sun/Moon for Fortune (safe)
-    sun_res = _safe_calc_ut(jd_ut, swe.SUN)
-    moon_res = _safe_calc_ut(jd_ut, swe.MOON)
-    if sun_res is None or moon_res is None or asc is None:
+    sun_lon = moon_lon = sun_lat = None
+    sun_house_pos = None
+    if bodies is not None:
+        sun_lon, sun_lat = bodies.value("Sun", "lon"), bodies.value("Sun", "lat")
+        moon_lon = bodies.value("Moon", "lon")
+        sun_house_pos = bodies.value("Sun", "house_pos")
+    else:
+        sun_res = _safe_calc_ut(jd_ut, swe.SUN)
+        moon_res = _safe_calc_ut(jd_ut, swe.MOON)
+        if sun_res is not None and moon_res is not None:
+            xx_sun, _ = sun_res
+            xx_moon, _ = moon_res
+            sun_lon = wrap360(float(xx_sun[0]))
+            sun_lat = float(xx_sun[1])
+            moon_lon = wrap360(float(xx_moon[0]))
+
+    if sun_lon is None or moon_lon is None:
         fortune = None
-        sun_lon = None
-        moon_lon = None
         is_day = True
     else:
-        xx_sun, _ = sun_res
-        xx_moon, _ = moon_res
-        sun_lon = wrap360(float(xx_sun[0]))
-        moon_lon = wrap360(float(xx_moon[0]))
-
-        try:
-            sun_house_pos = swe.house_pos(jd_ut, latitude, longitude, hs, sun_lon, float(xx_sun[1]))
-            is_day = (sun_house_pos is not None and float(sun_house_pos) <= 6.0)
-        except Exception:
-            is_day = True
+        # Gündüz haritası: Güneş ufkun üstünde (7-12. evler)
+        if sun_house_pos is None:
+            hpos = float(_house_pos_swe(jd_ut, latitude, armc, hs, [sun_lon], [sun_lat or 0.0])[0])
+            sun_house_pos = None if math.isnan(hpos) else hpos
+        is_day = True if sun_house_pos is None else sun_house_pos >= 7.0
 
         if is_day:
             fortune = wrap360(asc + moon_lon - sun_lon)
@@ -259,31 +470,96 @@ def compute_angles_and_points(
 # ASPECTS
 # ----------------------------
 
-def compute_aspects_between(objects: Dict[str, Dict[str, Any]]) -> List[Dict[str, float]]:
-    names = [k for k, v in objects.items() if v.get("lon") is not None]
+def _aspect_scan(lons: np.ndarray, aspect_degs: np.ndarray, orbs: np.ndarray, mask_by_signdiff: np.ndarray):
+    """
+    i < j tüm çiftleri tarar; her çift için ilk tutan aspect'i yazar.
+    Sadece burç farkına göre ulaşılabilir aspect'ler (mask_by_signdiff) denenir.
+    Dönüş: (i, j, aspect_idx, sep, orb) paralel array'ler + geçerli satır sayısı.
+    """
+    n = lons.shape[0]
+    m = n * (n - 1) // 2
+    out_i = np.empty(m, dtype=np.int64)
+    out_j = np.empty(m, dtype=np.int64)
+    out_k = np.empty(m, dtype=np.int64)
+    out_sep = np.empty(m, dtype=np.float64)
+    out_orb = np.empty(m, dtype=np.float64)
+    count = 0
+    for i in range(n):
+        sign_i = int(lons[i] // 30.0)
+        for j in range(i + 1, n):
+            mask = mask_by_signdiff[(int(lons[j] // 30.0) - sign_i) % 12]
+            sep = _angular_separation(lons[i], lons[j])
+            for k in range(aspect_degs.shape[0]):
+                if not (mask >> k) & 1:
+                    continue
+                orb = abs(sep - aspect_degs[k])
+                if orb <= orbs[k]:
+                    out_i[count] = i
+                    out_j[count] = j
+                    out_k[count] = k
+                    out_sep[count] = sep
+                    out_orb[count] = orb
+                    count += 1
+                    break
+    return out_i, out_j, out_k, out_sep, out_orb, count
+
+
+if njit is not None:
+    _aspect_scan = njit(cache=True, fastmath=True)(_aspect_scan)
+    # JIT'i import sırasında ısıt (ilk istekte derleme beklemesin)
+    _aspect_scan(np.zeros(2, dtype=np.float64), ASPECT_DEGS, ORBS, _ASPECT_MASK_BY_SIGNDIFF)
+
+
+def _aspect_scan_numpy(lons: np.ndarray, aspect_degs: np.ndarray, orbs: np.ndarray, mask_by_signdiff: np.ndarray):
+    # mask_by_signdiff sadece kernel ile aynı imza için; vektörel yolda budama kazanç getirmez
+    # Tüm çiftler için açı farkı (broadcast), sonra sadece üst üçgen (i < j)
+    d = np.abs(lons[:, None] - lons[None, :]) % 360.0
+    sep_mat = np.minimum(d, 360.0 - d)
+    ii, jj = np.triu_indices(lons.shape[0], k=1)
+    sep = sep_mat[ii, jj]
+
+    # (çift x aspect) orb matrisi; orb aralıkları çakışmadığı için en fazla bir aspect geçerli
+    orbs_mat = np.abs(sep[:, None] - aspect_degs[None, :])
+    valid = orbs_mat <= orbs[None, :]
+    best = np.argmin(np.where(valid, orbs_mat, np.inf), axis=1)
+
+    rows = np.flatnonzero(valid.any(axis=1))
+    kk = best[rows]
+    return ii[rows], jj[rows], kk, sep[rows], orbs_mat[rows, kk], rows.shape[0]
+
+
+def compute_aspects(names: Sequence[str], lons: np.ndarray) -> List[Dict[str, float]]:
+    """
+    names[i] <-> lons[i] (float64, NaN olmamalı). Sonuç orb'a göre sıralı.
+    """
     res: List[Dict[str, float]] = []
+    if len(names) < 2:
+        return res
 
-    for i in range(len(names)):
-        for j in range(i + 1, len(names)):
-            p1, p2 = names[i], names[j]
-            a, b = float(objects[p1]["lon"]), float(objects[p2]["lon"])
-            sep = angular_separation(a, b)
-            for asp_name, asp_deg in ASPECTS.items():
-                orb = abs(sep - float(asp_deg))
-                if orb <= DEFAULT_ORBS[asp_name]:
-                    res.append({
-                        "p1": p1,
-                        "p2": p2,
-                        "aspect": asp_name,
-                        "exact": float(asp_deg),
-                        "sep": float(sep),
-                        "orb": float(orb),
-                    })
-                    break
+    scan = _aspect_scan if njit is not None else _aspect_scan_numpy
+    ii, jj, kk, sep, orb, count = scan(
+        np.ascontiguousarray(lons, dtype=np.float64), ASPECT_DEGS, ORBS, _ASPECT_MASK_BY_SIGNDIFF,
+    )
+
+    for r in range(count):
+        k = int(kk[r])
+        res.append({
+            "p1": names[ii[r]],
+            "p2": names[jj[r]],
+            "aspect": ASPECT_NAMES[k],
+            "exact": float(ASPECT_DEGS[k]),
+            "sep": float(sep[r]),
+            "orb": float(orb[r]),
+        })
 
     res.sort(key=lambda x: x["orb"])
     return res
 
+def compute_aspects_between(objects: Dict[str, Dict[str, Any]]) -> List[Dict[str, float]]:
+    names = [k for k, v in objects.items() if v.get("lon") is not None]
+    lons = np.fromiter((float(objects[n]["lon"]) for n in names), dtype=np.float64, count=len(names))
+    return compute_aspects(names, lons)
+
 # ----------------------------
 # PUBLIC API
 # ----------------------------
@@ -300,34 +576,70 @@ def compute_natal_chart(
     longitude: float,
     tz_offset_hours: float = 3.0,
     house_system: str = "P",
+) -> Dict[str, object]:
+    """
+    Aynı girdiler için sonuç cache'lenir (compute_natal_chart.cache_clear() ile temizlenir).
+    Dönen dict cache ile paylaşılır; değiştirmeden kullanın.
+    """
+    return _compute_natal_chart_cached(
+        name, year, month, day, hour, minute,
+        latitude, longitude, tz_offset_hours, house_system,
+    )
+
+@lru_cache(maxsize=512)
+def _compute_natal_chart_cached(
+    name: str,
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    latitude: float,
+    longitude: float,
+    tz_offset_hours: float,
+    house_system: str,
 ) -> Dict[str, object]:
     jd_ut = to_julian_day_ut(year, month, day, hour, minute, tz_offset_hours)
 
     bodies = compute_all_bodies(jd_ut)
-    houses = compute_houses(jd_ut, latitude, longitude, house_system=house_system)
-    points = compute_angles_and_points(jd_ut, latitude, longitude, house_system=house_system)
-
-    compute_planet_houses(jd_ut, latitude, longitude, house_system, bodies)
 
-    # Planet aspects: only major planets that are available
-    major_planets = {k: bodies[k] for k in MAJOR_PLANET_NAMES if k in bodies and bodies[k].get("lon") is not None}
-    planet_aspects = compute_aspects_between(major_planets)
-
-    # Other aspects: points + extras + major planets
-    other_objects: Dict[str, Dict[str, Any]] = {}
-    other_objects.update(points)
-
-    for k in ["TrueNode", "Chiron", "Lilith"]:
-        if k in bodies and bodies[k].get("lon") is not None:
-            other_objects[k] = bodies[k]
+    # swe.houses bir kere: houses + planet houses + angles/points aynı sonucu paylaşır
+    houses_raw = swe.houses(jd_ut, latitude, longitude, _hs_bytes(house_system))
+    houses = compute_houses(jd_ut, latitude, longitude, house_system=house_system, precomputed=houses_raw)
+    compute_planet_houses(
+        jd_ut, latitude, longitude, house_system, bodies,
+        cusps=houses["cusps"], armc=houses_raw[1][2],
+    )
+    points = compute_angles_and_points(
+        jd_ut, latitude, longitude, house_system=house_system,
+        precomputed=houses_raw, bodies=bodies,
+    )
 
-    other_objects.update(major_planets)
-    other_aspects = compute_aspects_between(other_objects)
+    # Tek geçiş: points + extras + major planets hepsi birlikte, sonra ayır
+    body_idx = [
+        bodies.name_to_idx[k] for k in ["TrueNode", "Chiron", "Lilith", *MAJOR_PLANET_NAMES]
+        if k in bodies.name_to_idx and bodies.available[bodies.name_to_idx[k]]
+    ]
+    names = [*points, *(bodies.names[i] for i in body_idx)]
+    lons = np.concatenate((
+        np.fromiter((pt["lon"] for pt in points.values()), dtype=np.float64, count=len(points)),
+        bodies.lon[body_idx],
+    ))
+
+    # Planet aspects: iki ucu da major planet; other aspects: en az bir ucu point/extra
+    majors = set(MAJOR_PLANET_NAMES)
+    planet_aspects: List[Dict[str, float]] = []
+    other_aspects: List[Dict[str, float]] = []
+    for a in compute_aspects(names, lons):
+        if a["p1"] in majors and a["p2"] in majors:
+            planet_aspects.append(a)
+        else:
+            other_aspects.append(a)
 
     return {
         "name": name,
         "jd_ut": jd_ut,
-        "planets": bodies,     # includes extras; unavailable ones have available=False
+        "planets": bodies.to_dicts(),     # includes extras; unavailable ones have available=False
         "houses": houses,
         "points": points,
         "aspects": {
@@ -335,3 +647,5 @@ def compute_natal_chart(
             "other_aspects": other_aspects,
         },
     }
+
+compute_natal_chart.cache_clear = _compute_natal_chart_cached.cache_clear
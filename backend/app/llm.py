@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import ast
 import os
 import json
 import re
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 
 from openai import OpenAI
 
+# orjson opsiyonel: varsa JSON parse için onu kullan (stdlib json'dan hızlı)
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
 
 # -----------------------------
 # OpenAI client
@@ -24,26 +33,38 @@ def get_client() -> Optional[OpenAI]:
 # -----------------------------
 # Helpers: parse chart from prompt
 # -----------------------------
+_CHART_RE = re.compile(r"Chart data:\s*(\{.*\})\s*$", re.DOTALL)
+_PY_LITERAL_RE = re.compile(r": (None|True|False)")
+_PY_LITERAL_JSON = {"None": ": null", "True": ": true", "False": ": false"}
+
+
 def _extract_chart_from_user_prompt(user_prompt: str) -> Optional[Dict[str, Any]]:
     if not user_prompt:
         return None
 
-    m = re.search(r"Chart data:\s*(\{.*\})\s*$", user_prompt, flags=re.DOTALL)
+    m = _CHART_RE.search(user_prompt)
     if not m:
         return None
 
     raw = m.group(1).strip()
 
-    # Strategy 1: JSON parse directly
+    # Strategy 1: JSON parse directly (backend chart'ı JSON olarak gönderiyor)
     try:
-        return json.loads(raw)
+        return _json_loads(raw)
     except Exception:
         pass
 
-    # Strategy 2: best-effort coerce Python dict repr -> JSON
-    coerced = raw
-    coerced = coerced.replace(": None", ": null").replace(": True", ": true").replace(": False", ": false")
-    coerced = re.sub(r"'", '"', coerced)
+    # Strategy 2: Python dict repr -> ast.literal_eval (regex yok)
+    try:
+        parsed = ast.literal_eval(raw)
+        if isinstance(parsed, dict):
+            return parsed
+    except Exception:
+        pass
+
+    # Strategy 3: best-effort coerce Python dict repr -> JSON
+    coerced = _PY_LITERAL_RE.sub(lambda lit: _PY_LITERAL_JSON[lit.group(1)], raw)
+    coerced = coerced.replace("'", '"')
 
     try:
         return json.loads(coerced)
@@ -52,11 +73,8 @@ def _extract_chart_from_user_prompt(user_prompt: str) -> Optional[Dict[str, Any]
 
 
 def _deg_str(deg: float) -> str:
-    d = int(deg)
-    mins = int(round((deg - d) * 60))
-    if mins == 60:
-        d += 1
-        mins = 0
+    # tek yuvarlama: toplam yay dakikası -> (derece, dakika)
+    d, mins = divmod(int(deg * 60.0 + 0.5), 60)
     return f"{d}°{mins:02d}′"
 
 
@@ -89,6 +107,8 @@ def _top_aspects(chart: Dict[str, Any], n: int = 10) -> List[Dict[str, Any]]:
 # NEW: Metadata stripping (works for inline tags too)
 # -----------------------------
 _TAG_INLINE_RE = re.compile(r"\[(TYPE|BODY|SIGN|KEY)=[^\]]+\]\s*", re.IGNORECASE)
+_MULTISPACE_RE = re.compile(r"[ \t]{2,}")
+_MULTINL_RE = re.compile(r"\n{3,}")
 
 def _strip_metadata(text: str) -> str:
     if not text:
@@ -96,37 +116,59 @@ def _strip_metadata(text: str) -> str:
 
     t = text.strip()
     t = _TAG_INLINE_RE.sub("", t)
-    t = re.sub(r"[ \t]{2,}", " ", t)
-    t = re.sub(r"\n{3,}", "\n\n", t).strip()
+    t = _MULTISPACE_RE.sub(" ", t)
+    t = _MULTINL_RE.sub("\n\n", t).strip()
     return t
 
 
+_BODY_TAG_RE = re.compile(r"\[BODY=([^\]]*)\]")
+_SIGN_TAG_RE = re.compile(r"\[SIGN=([^\]]*)\]")
+_BODY_IN_SIGN_RE = re.compile(r"(?=\b(\w+) in (\w+)\b)")
+
+PassageIndex = Tuple[Dict[Tuple[str, str], str], Dict[Tuple[str, str], str]]
+
+
+def _index_passages(passages: List[Dict[str, str]] | None) -> PassageIndex:
+    """
+    Tek geçişte iki index: [BODY=X][SIGN=Y] etiketleri ve "body in sign" ifadeleri.
+    Aynı anahtar için ilk (en yüksek skorlu) passage kalır.
+    """
+    by_tag: Dict[Tuple[str, str], str] = {}
+    by_phrase: Dict[Tuple[str, str], str] = {}
+    for p in passages or []:
+        txt = (p.get("text") or "")
+        if not txt:
+            continue
+        bodies = _BODY_TAG_RE.findall(txt)
+        if bodies:
+            signs = _SIGN_TAG_RE.findall(txt)
+            for b in bodies:
+                for s in signs:
+                    by_tag.setdefault((b, s), txt)
+        for b, s in _BODY_IN_SIGN_RE.findall(txt.lower()):
+            by_phrase.setdefault((b, s), txt)
+    return by_tag, by_phrase
+
+
 def _pick_placement_passage(
-    passages: List[Dict[str, str]] | None,
+    index: PassageIndex,
     *,
     body: str,
     sign: str,
 ) -> Optional[str]:
-    if not passages or not body or not sign:
+    if not body or not sign:
         return None
 
-    body_u = body.upper()
-    sign_u = sign.upper()
+    by_tag, by_phrase = index
 
     # strict tag match first
-    for p in passages:
-        txt = (p.get("text") or "")
-        if f"[BODY={body_u}]" in txt and f"[SIGN={sign_u}]" in txt:
-            return _strip_metadata(txt)
+    txt = by_tag.get((body.upper(), sign.upper()))
 
     # fallback: "Body in Sign" match
-    needle = f"{body.title()} in {sign.title()}"
-    for p in passages:
-        txt = (p.get("text") or "")
-        if needle.lower() in txt.lower():
-            return _strip_metadata(txt)
+    if txt is None:
+        txt = by_phrase.get((body.lower(), sign.lower()))
 
-    return None
+    return _strip_metadata(txt) if txt is not None else None
 
 
 # -----------------------------
@@ -137,12 +179,12 @@ _SIGNS = [
     "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
 ]
 
+_SIGN_BY_INT_DEG = tuple(_SIGNS[i // 30] for i in range(360))
+
 def _lon_to_sign_deg(lon: float) -> tuple[str, float]:
     x = float(lon) % 360.0
-    sign_idx = int(x // 30.0)
-    sign = _SIGNS[sign_idx]
-    deg_in_sign = x - 30.0 * sign_idx
-    return sign, deg_in_sign
+    idx = int(x)
+    return _SIGN_BY_INT_DEG[idx], x - 30.0 * (idx // 30)
 
 
 def _ordinal(n: int) -> str:
@@ -194,6 +236,7 @@ def _corpus_only_interpretation(
     retrieved_passages: List[Dict[str, str]] | None,
 ) -> str:
     chart = _extract_chart_from_user_prompt(user_prompt) or {}
+    passage_index = _index_passages(retrieved_passages)
     planets = chart.get("planets") or {}
     points = chart.get("points") or {}
     houses = chart.get("houses") or {}
@@ -240,13 +283,13 @@ def _corpus_only_interpretation(
 
     # Sun/Moon placement texts
     if sun_sign:
-        sun_txt = _pick_placement_passage(retrieved_passages, body="SUN", sign=str(sun_sign))
+        sun_txt = _pick_placement_passage(passage_index, body="SUN", sign=str(sun_sign))
         if sun_txt:
             lines.append("\n**Sun — Core Identity**")
             lines.append(sun_txt)
 
     if moon_sign:
-        moon_txt = _pick_placement_passage(retrieved_passages, body="MOON", sign=str(moon_sign))
+        moon_txt = _pick_placement_passage(passage_index, body="MOON", sign=str(moon_sign))
         if moon_txt:
             lines.append("\n**Moon — Emotional Needs**")
             lines.append(moon_txt)
@@ -266,7 +309,7 @@ def _corpus_only_interpretation(
         sign = p.get("sign")
         if not sign:
             continue
-        txt = _pick_placement_passage(retrieved_passages, body=body.upper(), sign=str(sign))
+        txt = _pick_placement_passage(passage_index, body=body.upper(), sign=str(sign))
         if txt:
             lines.append(f"\n**{title}**")
             lines.append(txt)
@@ -287,7 +330,7 @@ def _corpus_only_interpretation(
         sign = p.get("sign")
         if not sign:
             continue
-        txt = _pick_placement_passage(retrieved_passages, body=body, sign=str(sign))
+        txt = _pick_placement_passage(passage_index, body=body, sign=str(sign))
         if txt:
             lines.append(f"\n**{title}**")
             lines.append(txt)
@@ -314,7 +357,7 @@ def _corpus_only_interpretation(
         sign = (obj or {}).get("sign")
         if not sign:
             continue
-        txt = _pick_placement_passage(retrieved_passages, body=body, sign=str(sign))
+        txt = _pick_placement_passage(passage_index, body=body, sign=str(sign))
         if txt:
             lines.append(f"\n**{title}**")
             lines.append(txt)
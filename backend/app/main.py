@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import asyncio
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -23,6 +25,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# backend/data/corpus/placements
+_PLACEMENTS_DIR = Path(__file__).resolve().parent.parent / "data" / "corpus" / "placements"
+
+_PLANETS = ("Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto", "TrueNode", "Chiron", "Lilith")
+_POINTS = ("Asc", "MC", "Vertex", "Fortune")
+
+# (corpus BODY tag, placements klasörü, chart anahtarı); Vertex/Fortune points'ten gelir.
+# Vertex/Fortune sadece o klasörler/dosyalar varsa force edilir.
+_ANCHORS = (
+    ("SUN", "sun", "Sun"),
+    ("MOON", "moon", "Moon"),
+    ("MERCURY", "mercury", "Mercury"),
+    ("VENUS", "venus", "Venus"),
+    ("MARS", "mars", "Mars"),
+    ("TRUENODE", "true_node", "TrueNode"),
+    ("CHIRON", "chiron", "Chiron"),
+    ("LILITH", "lilith", "Lilith"),
+    ("VERTEX", "vertex", "Vertex"),
+    ("FORTUNE", "fortune", "Fortune"),
+)
+
+
 # ---------- helpers ----------
 def _read_text_if_exists(fp: Path) -> str | None:
     if not fp.exists():
@@ -31,31 +55,82 @@ def _read_text_if_exists(fp: Path) -> str | None:
     return t or None
 
 
-def _find_placement_file(body: str, sign: str) -> str | None:
+# (body, sign) -> placement metni; ilk istekte bir kez yüklenir, rebuild-index'te sıfırlanır
+_PLACEMENT_CACHE: dict[tuple[str, str], str] | None = None
+
+
+def _load_placements() -> dict[tuple[str, str], str]:
     """
-    Look for placement files like:
+    Read placement files like:
       backend/data/corpus/placements/chiron/chiron_in_pisces.txt
       backend/data/corpus/placements/true_node/true_node_in_aries.txt
+    <body>_in_<sign>.txt, aynı isimli .corpus.txt'ye göre önceliklidir; boş dosyalar atlanır.
     """
+    found: dict[tuple[str, str], str] = {}
+    fallback: dict[tuple[str, str], str] = {}
+    if not _PLACEMENTS_DIR.is_dir():
+        return found
+
+    for body_dir in _PLACEMENTS_DIR.iterdir():
+        if not body_dir.is_dir():
+            continue
+        b = body_dir.name
+        prefix = f"{b}_in_"
+        for fp in body_dir.iterdir():
+            name = fp.name
+            if not name.startswith(prefix):
+                continue
+            if name.endswith(".corpus.txt"):
+                target, sign = fallback, name[len(prefix):-len(".corpus.txt")]
+            elif name.endswith(".txt"):
+                target, sign = found, name[len(prefix):-len(".txt")]
+            else:
+                continue
+            txt = _read_text_if_exists(fp)
+            if txt:
+                target[(b, sign)] = txt
+
+    for key, txt in fallback.items():
+        found.setdefault(key, txt)
+    return found
+
+
+def _find_placement_file(body: str, sign: str) -> str | None:
+    global _PLACEMENT_CACHE
     if not body or not sign:
         return None
+    cache = _PLACEMENT_CACHE
+    if cache is None:
+        cache = _PLACEMENT_CACHE = _load_placements()
+    return cache.get((body.lower(), sign.lower()))
 
-    base = Path(__file__).resolve().parent.parent  # backend/
-    corpus_dir = base / "data" / "corpus" / "placements"
 
-    b = body.lower()
-    s = sign.lower()
+def _natal_chart_for(birth: BirthData) -> dict:
+    """
+    Her iki endpoint de aynı argümanlarla çağırır; /chart/natal ardından gelen
+    /interpret/natal compute_natal_chart'ın cache'inden döner.
+    """
+    return compute_natal_chart(
+        name=birth.name,
+        year=birth.year,
+        month=birth.month,
+        day=birth.day,
+        hour=birth.hour,
+        minute=birth.minute,
+        latitude=birth.latitude,
+        longitude=birth.longitude,
+        tz_offset_hours=birth.tz_offset_hours,
+        house_system=getattr(birth, "house_system", "P"),
+    )
 
-    candidates = [
-        corpus_dir / b / f"{b}_in_{s}.txt",
-        corpus_dir / b / f"{b}_in_{s}.corpus.txt",
-    ]
 
-    for fp in candidates:
-        txt = _read_text_if_exists(fp)
+def _forced_placements(placements: list[tuple[str, str]]) -> list[dict]:
+    forced: list[dict] = []
+    for folder, sign in placements:
+        txt = _find_placement_file(folder, sign)
         if txt:
-            return txt
-    return None
+            forced.append({"source": f"FORCED | placements/{folder}/{folder}_in_{sign.lower()}.txt", "text": txt})
+    return forced
 
 
 @app.get("/api/health")
@@ -65,65 +140,25 @@ def health():
 
 @app.post("/api/rebuild-index")
 def rebuild_index_route():
+    global _PLACEMENT_CACHE
     chunks = build_index()
+    _PLACEMENT_CACHE = None
     return {"chunks": len(chunks)}
 
 
 @app.post("/api/chart/natal")
 def natal_chart(birth: BirthData):
-    chart = compute_natal_chart(
-        name=birth.name,
-        year=birth.year,
-        month=birth.month,
-        day=birth.day,
-        hour=birth.hour,
-        minute=birth.minute,
-        latitude=birth.latitude,
-        longitude=birth.longitude,
-        tz_offset_hours=birth.tz_offset_hours,
-        house_system="P",
-    )
-    return chart
+    return _natal_chart_for(birth)
 
 
 @app.post("/api/interpret/natal")
-def interpret_natal(birth: BirthData):
-    chart = compute_natal_chart(
-        name=birth.name,
-        year=birth.year,
-        month=birth.month,
-        day=birth.day,
-        hour=birth.hour,
-        minute=birth.minute,
-        latitude=birth.latitude,
-        longitude=birth.longitude,
-        tz_offset_hours=birth.tz_offset_hours,
-        house_system=getattr(birth, "house_system", "P"),
-    )
+async def interpret_natal(birth: BirthData):
+    # bloklayan işler (ephemeris, disk, LLM) event loop dışında, thread pool'da çalışır
+    chart = await asyncio.to_thread(_natal_chart_for, birth)
 
     planets = chart.get("planets", {}) or {}
     points = chart.get("points", {}) or {}
 
-    def _psign(p: str) -> str | None:
-        return (planets.get(p, {}) or {}).get("sign")
-
-    def _xsign_point(k: str) -> str | None:
-        return (points.get(k, {}) or {}).get("sign")
-
-    # ---- signs we care about ----
-    sun_sign = _psign("Sun")
-    moon_sign = _psign("Moon")
-    mercury_sign = _psign("Mercury")
-    venus_sign = _psign("Venus")
-    mars_sign = _psign("Mars")
-
-    true_node_sign = _psign("TrueNode")
-    chiron_sign = _psign("Chiron")
-    lilith_sign = _psign("Lilith")
-
-    vertex_sign = _xsign_point("Vertex")
-    fortune_sign = _xsign_point("Fortune")
-
     # aspects summary for query
     aspects = chart.get("aspects", {}) or {}
     planet_aspects = aspects.get("planet_aspects", []) or []
@@ -132,72 +167,44 @@ def interpret_natal(birth: BirthData):
     top_aspects = all_aspects[:20]
 
     # ---- build query ----
-    q = "natal chart interpretation "
+    parts: list[str] = ["natal chart interpretation "]
 
     # planet+sign tokens
-    for p in ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto", "TrueNode", "Chiron", "Lilith"]:
+    for p in _PLANETS:
         s = (planets.get(p, {}) or {}).get("sign")
         if s:
-            q += f"{p} {s} "
+            parts.append(f"{p} {s} ")
 
     # points tokens
-    for k in ["Asc", "MC", "Vertex", "Fortune"]:
+    for k in _POINTS:
         s = (points.get(k, {}) or {}).get("sign")
         if s:
-            q += f"{k} {s} "
-
-    # add strong anchors (match your corpus tags)
-    def _anchor(body_tag: str, sign: str | None, key: str):
-        nonlocal q
-        if sign:
-            q += f" | [BODY={body_tag}] [SIGN={str(sign).upper()}] | KEY={key} "
-
-    _anchor("SUN", sun_sign, f"sun_in_{str(sun_sign).lower()}" if sun_sign else "sun_in_x")
-    _anchor("MOON", moon_sign, f"moon_in_{str(moon_sign).lower()}" if moon_sign else "moon_in_x")
-    _anchor("MERCURY", mercury_sign, f"mercury_in_{str(mercury_sign).lower()}" if mercury_sign else "mercury_in_x")
-    _anchor("VENUS", venus_sign, f"venus_in_{str(venus_sign).lower()}" if venus_sign else "venus_in_x")
-    _anchor("MARS", mars_sign, f"mars_in_{str(mars_sign).lower()}" if mars_sign else "mars_in_x")
-
-    _anchor("TRUENODE", true_node_sign, f"true_node_in_{str(true_node_sign).lower()}" if true_node_sign else "true_node_in_x")
-    _anchor("CHIRON", chiron_sign, f"chiron_in_{str(chiron_sign).lower()}" if chiron_sign else "chiron_in_x")
-    _anchor("LILITH", lilith_sign, f"lilith_in_{str(lilith_sign).lower()}" if lilith_sign else "lilith_in_x")
+            parts.append(f"{k} {s} ")
 
-    _anchor("VERTEX", vertex_sign, f"vertex_in_{str(vertex_sign).lower()}" if vertex_sign else "vertex_in_x")
-    _anchor("FORTUNE", fortune_sign, f"fortune_in_{str(fortune_sign).lower()}" if fortune_sign else "fortune_in_x")
+    # add strong anchors (match your corpus tags) + forced placement files
+    placements: list[tuple[str, str]] = []
+    for tag, folder, key in _ANCHORS:
+        sign = (planets.get(key) or points.get(key) or {}).get("sign")
+        if not sign:
+            continue
+        s = str(sign)
+        parts.append(f" | [BODY={tag}] [SIGN={s.upper()}] | KEY={folder}_in_{s.lower()} ")
+        placements.append((folder, s))
 
     # aspects tokens
-    q += " | " + " ".join(
+    parts.append(" | ")
+    parts.append(" ".join(
         f"{a.get('p1')} {a.get('aspect')} {a.get('p2')}"
         for a in top_aspects
         if a.get("p1") and a.get("p2") and a.get("aspect")
-    )
+    ))
+    q = "".join(parts)
 
-    # ---- retrieval ----
-    passages = retrieve(q, k=40)
-
-    # ---- OPTIONAL: Force key placement files to always be present (top) ----
-    forced: list[dict] = []
-
-    def _force(body_folder: str, sign: str | None):
-        if not sign:
-            return
-        txt = _find_placement_file(body_folder, str(sign))
-        if txt:
-            forced.append({"source": f"FORCED | placements/{body_folder}/{body_folder}_in_{str(sign).lower()}.txt", "text": txt})
-
-    _force("sun", sun_sign)
-    _force("moon", moon_sign)
-    _force("mercury", mercury_sign)
-    _force("venus", venus_sign)
-    _force("mars", mars_sign)
-
-    _force("chiron", chiron_sign)
-    _force("true_node", true_node_sign)
-    _force("lilith", lilith_sign)
-
-    # (Vertex/Fortune are points, only force if you actually created those folders/files)
-    _force("vertex", vertex_sign)
-    _force("fortune", fortune_sign)
+    # ---- retrieval + OPTIONAL forced placement files (always present, top) ----
+    passages, forced = await asyncio.gather(
+        asyncio.to_thread(retrieve, q, k=40),
+        asyncio.to_thread(_forced_placements, placements),
+    )
 
     if forced:
         forced_texts = {f["text"] for f in forced}
@@ -205,9 +212,10 @@ def interpret_natal(birth: BirthData):
         passages = forced + tail
 
     # ---- generate ----
-    text = generate_interpretation(
+    text = await asyncio.to_thread(
+        generate_interpretation,
         system_prompt="You are a professional astrology interpreter.",
-        user_prompt=f"Chart data:\n{chart}",
+        user_prompt=f"Chart data:\n{json.dumps(chart, ensure_ascii=False)}",
         retrieved_passages=passages,
     )
 
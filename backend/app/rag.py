@@ -1,146 +1,358 @@
 from __future__ import annotations
 
 import json
-import math
+import multiprocessing
+import os
 import re
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from itertools import repeat
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csc_matrix, csr_matrix
+
+# orjson opsiyonel: varsa index JSONL satırları için onu kullan (stdlib json'dan hızlı)
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+if orjson is not None:
+    _json_loads = orjson.loads
+    _json_dumpb = orjson.dumps
+else:
+    _json_loads = json.loads
+
+    def _json_dumpb(obj: object) -> bytes:
+        # orjson çıktısıyla aynı biçim: kompakt, UTF-8
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 CORPUS_DIR = DATA_DIR / "corpus"
-INDEX_PATH = DATA_DIR / "index.json"
+# Index iki dosya: chunk metinleri (JSONL, satır başına id/source/text) +
+# terim sayıları CSR matrisi ve vocab (npz, pickle'sız)
+INDEX_PATH = DATA_DIR / "index.jsonl"
+TF_PATH = DATA_DIR / "index_tf.npz"
 
-STOPWORDS = {
+# Bu kadar dosyanın altında process pool açmak (spawn + pickle) kazançtan pahalı
+_PARALLEL_MIN_FILES = 256
+
+# Parse edilmiş index process içinde tutulur; index dosyalarının mtime'ı değişince yeniden okunur.
+# Okuma ve yeni index dosyalarının yerine konması aynı lock altında (RLock: build_index
+# eksik index'i lock içinden de yazabilir).
+_INDEX_LOCK = threading.RLock()
+_INDEX_CACHE: Optional[RetrievalIndex] = None
+_INDEX_MTIME: Optional[Tuple[float, float]] = None
+
+STOPWORDS = frozenset({
     "a", "an", "the", "and", "or", "but", "is", "are", "was", "were",
     "to", "of", "in", "for", "on", "with", "as", "at", "by", "from",
     "this", "that", "these", "those", "it", "its", "be", "been", "being",
-}
+})
 
-_word_re = re.compile(r"[a-zA-Z]+")
+# Metin tokenize'dan önce bir kez lower() edilir; token başına lower() yok
+_word_re = re.compile(r"[a-z]+")
+# \s+ -> " " ile aynı sonuç, ama tek boşluklara dokunmaz (eşleşme sayısı çok daha az)
+_ws_re = re.compile(r"\s{2,}|[^\S ]")
+
+# Okapi BM25 parametreleri
+BM25_K1 = 1.5
+BM25_B = 0.75
 
 
 def tokenize(text: str) -> List[str]:
-    tokens = [m.group(0).lower() for m in _word_re.finditer(text)]
-    return [t for t in tokens if t not in STOPWORDS]
+    sw = STOPWORDS
+    return [t for t in _word_re.findall(text.lower()) if t not in sw]
 
 
 def chunk_text(text: str, max_chars: int = 1200, overlap: int = 150) -> List[str]:
-    text = re.sub(r"\s+", " ", text).strip()
-    if len(text) <= max_chars:
+    assert max_chars > overlap, "max_chars must be greater than overlap"
+    text = _ws_re.sub(" ", text).strip()
+    n = len(text)
+    if n <= max_chars:
         return [text] if text else []
-    chunks: List[str] = []
-    i = 0
-    while i < len(text):
-        end = min(len(text), i + max_chars)
-        chunks.append(text[i:end])
-        if end >= len(text):
-            break
-        i = max(0, end - overlap)
-    return chunks
+    # son chunk metnin sonuna ulaşan ilk pencere
+    step = max_chars - overlap
+    last = -(-(n - max_chars) // step) * step
+    return [text[i:i + max_chars] for i in range(0, last + 1, step)]
 
 
 @dataclass
 class DocChunk:
+    """
+    Terim sayıları chunk'ta tutulmaz; RetrievalIndex.postings'te (satır = chunk) durur.
+    """
     id: str
     source: str
     text: str
-    tf: Dict[str, float]
-    norm: float
 
 
-def _iter_corpus_files() -> List[Path]:
+@dataclass
+class RetrievalIndex:
+    """
+    Sorgu tarafı: chunk'lar + (N_chunks, V) CSC matrisi (inverted index: sütun j = terim j'nin posting'leri).
+    Hücreler BM25 doküman ağırlığı: idf[t] * tf*(k1+1) / (tf + k1*(1 - b + b*|d|/avgdl)).
+    Skor sadece sorgu terimlerinin sütunları üzerinden: postings[:, q_cols] @ q_counts.
+    """
+    chunks: List[DocChunk]
+    vocab: Dict[str, int]
+    idf: np.ndarray
+    doc_len: np.ndarray
+    avgdl: float
+    postings: csc_matrix
+
+
+def _build_retrieval_index(chunks: List[DocChunk], tf: csr_matrix, vocab: Dict[str, int]) -> RetrievalIndex:
+    n_docs = len(chunks)
+    indices_arr = tf.indices
+    indptr_arr = tf.indptr
+    tf_arr = tf.data.astype(np.float64, copy=False)
+
+    df = np.bincount(indices_arr, minlength=len(vocab)).astype(np.float64)
+    idf = np.log((n_docs - df + 0.5) / (df + 0.5) + 1.0)
+
+    rows = np.repeat(np.arange(n_docs), np.diff(indptr_arr))
+    doc_len = np.bincount(rows, weights=tf_arr, minlength=n_docs)
+    avgdl = float(doc_len.mean()) if n_docs else 0.0
+    avgdl = avgdl or 1.0
+
+    dl = doc_len[rows]
+    weights = idf[indices_arr] * tf_arr * (BM25_K1 + 1.0) / (
+        tf_arr + BM25_K1 * (1.0 - BM25_B + BM25_B * dl / avgdl)
+    )
+
+    postings = csr_matrix((weights, indices_arr, indptr_arr), shape=(n_docs, len(vocab))).tocsc()
+    return RetrievalIndex(chunks=chunks, vocab=vocab, idf=idf, doc_len=doc_len, avgdl=avgdl, postings=postings)
+
+
+def _scan_txt_files(root: str) -> Iterator[os.DirEntry]:
+    # DirEntry.is_dir/is_file dizin okumasından gelen d_type'ı kullanır (ek stat yok)
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _scan_txt_files(entry.path)
+            elif entry.name.endswith(".txt") and entry.is_file():
+                yield entry
+
+
+def _iter_corpus_files() -> List[os.DirEntry]:
     """
     Recursively collect all .txt files under CORPUS_DIR.
     Supports folder structures like:
       corpus/placements/sun/sun_in_aquarius.txt
       corpus/rules/01_output_structure_extent.txt
     """
-    if not CORPUS_DIR.exists():
+    if not CORPUS_DIR.is_dir():
         return []
-    files = [p for p in CORPUS_DIR.rglob("*.txt") if p.is_file()]
-    files.sort(key=lambda p: str(p).lower())
+    files = list(_scan_txt_files(str(CORPUS_DIR)))
+    files.sort(key=lambda e: e.path.lower())
     return files
 
 
-def build_index() -> List[DocChunk]:
+def _process_file(path: str, corpus_root: str) -> List[Dict[str, object]]:
+    """
+    Tek dosya -> chunk dict'leri. ProcessPoolExecutor worker'ında çalışır
+    (top-level ve sadece düz tipler döner ki pickle edilebilsin).
+    """
+    with open(path, "rb") as f:
+        raw = f.read().decode("utf-8", "ignore").strip()
+    if not raw or len(raw) < 20:
+        return []
+
+    rel_source = os.path.relpath(path, corpus_root).replace(os.sep, "/")
+
+    out: List[Dict[str, object]] = []
+    for k, ch in enumerate(chunk_text(raw)):
+        toks = tokenize(ch)
+        tf = Counter(toks)
+
+        out.append({
+            "id": f"{rel_source}:{k}",
+            "source": rel_source,
+            "text": ch,
+            "tf": dict(tf),
+        })
+    return out
+
+
+def build_index() -> List[Tuple[str, str]]:
+    """
+    Corpus'u chunk'layıp index dosyalarına yazar; (id, source) listesi döner.
+    Chunk'lar üretildikçe diske yazılır, tüm payload bellekte tutulmaz.
+    """
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     CORPUS_DIR.mkdir(parents=True, exist_ok=True)
 
-    chunks: List[DocChunk] = []
-    files = _iter_corpus_files()
+    corpus_root = str(CORPUS_DIR)
+    # < 20 byte dosya strip sonrası da < 20 karakter: okumadan atla
+    paths = [e.path for e in _iter_corpus_files() if e.stat().st_size >= 20]
+
+    if len(paths) >= _PARALLEL_MIN_FILES:
+        # spawn: build_index uvicorn'un thread pool'undan çağrılır; çok thread'li process'i fork etmek kilitlenebilir
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as ex:
+            manifest = _write_index(ex.map(_process_file, paths, repeat(corpus_root), chunksize=16))
+    else:
+        manifest = _write_index(_process_file(p, corpus_root) for p in paths)
+
+    _invalidate_index_cache()
+    return manifest
+
 
-    for path in files:
-        raw = path.read_text(encoding="utf-8", errors="ignore").strip()
-        if not raw or len(raw) < 20:
-            continue
+def _write_index(results: Iterable[List[Dict[str, object]]]) -> List[Tuple[str, str]]:
+    manifest: List[Tuple[str, str]] = []
+    vocab: Dict[str, int] = {}
+    indptr = [0]
+    indices: List[int] = []
+    tf: List[int] = []
 
-        rel_source = path.relative_to(CORPUS_DIR).as_posix()
+    # Canlı dosyalara yazılmaz: önce *.tmp (eş zamanlı rebuild'ler çakışmasın diye
+    # pid/thread'e özel), sonra ikisi birden lock altında yerine konur
+    suffix = f".{os.getpid()}-{threading.get_ident()}.tmp"
+    index_tmp = INDEX_PATH.with_name(INDEX_PATH.name + suffix)
+    tf_tmp = TF_PATH.with_name(TF_PATH.name + suffix)
 
-        for k, ch in enumerate(chunk_text(raw)):
-            toks = tokenize(ch)
-            tf: Dict[str, float] = {}
-            for t in toks:
-                tf[t] = tf.get(t, 0.0) + 1.0
+    try:
+        with open(index_tmp, "wb") as f:
+            for result in results:
+                for o in result:
+                    f.write(_json_dumpb({"id": o["id"], "source": o["source"], "text": o["text"]}))
+                    f.write(b"\n")
+                    for t, v in o["tf"].items():
+                        indices.append(vocab.setdefault(t, len(vocab)))
+                        tf.append(v)
+                    indptr.append(len(indices))
+                    manifest.append((o["id"], o["source"]))
 
-            norm = math.sqrt(sum(v * v for v in tf.values())) or 1.0
+        with open(tf_tmp, "wb") as f:
+            np.savez(
+                f,
+                data=np.asarray(tf, dtype=np.int32),
+                indices=np.asarray(indices, dtype=np.int32),
+                indptr=np.asarray(indptr, dtype=np.int32),
+                shape=np.asarray((len(manifest), len(vocab)), dtype=np.int64),
+                vocab=np.asarray(list(vocab), dtype=str),
+            )
+    except BaseException:
+        # yarım kalan build canlı index'e dokunmaz; geçici dosyaları da bırakmasın
+        index_tmp.unlink(missing_ok=True)
+        tf_tmp.unlink(missing_ok=True)
+        raise
 
-            chunks.append(DocChunk(
-                id=f"{rel_source}:{k}",
-                source=rel_source,
-                text=ch,
-                tf=tf,
-                norm=norm,
-            ))
+    # TF_PATH en son: ikisi birden varsa index tamdır
+    with _INDEX_LOCK:
+        os.replace(index_tmp, INDEX_PATH)
+        os.replace(tf_tmp, TF_PATH)
+    return manifest
 
-    payload = [
-        {"id": c.id, "source": c.source, "text": c.text, "tf": c.tf, "norm": c.norm}
-        for c in chunks
-    ]
-    INDEX_PATH.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
-    return chunks
+
+def _invalidate_index_cache() -> None:
+    global _INDEX_CACHE, _INDEX_MTIME
+    with _INDEX_LOCK:
+        _INDEX_CACHE = None
+        _INDEX_MTIME = None
 
 
 def load_index() -> List[DocChunk]:
-    if not INDEX_PATH.exists():
-        return build_index()
-    payload = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
+    return _load_retrieval_index().chunks
+
+
+def _index_mtime() -> Tuple[float, float]:
+    return INDEX_PATH.stat().st_mtime, TF_PATH.stat().st_mtime
+
+
+def _load_retrieval_index() -> RetrievalIndex:
+    global _INDEX_CACHE, _INDEX_MTIME
+    with _INDEX_LOCK:
+        try:
+            mtime = _index_mtime()
+        except FileNotFoundError:
+            # eş zamanlı ilk istekler aynı dosyaları birlikte yazmasın: build lock altında
+            build_index()
+            mtime = _index_mtime()
+
+        if _INDEX_CACHE is not None and _INDEX_MTIME == mtime:
+            return _INDEX_CACHE
+        try:
+            index = _build_retrieval_index(*_read_index())
+        except IndexMismatchError:
+            # JSONL ve npz farklı build'lerden (örn. yarım kalan kopya): yeniden üret
+            build_index()
+            mtime = _index_mtime()
+            index = _build_retrieval_index(*_read_index())
+        _INDEX_CACHE, _INDEX_MTIME = index, mtime
+        return index
+
+
+class IndexMismatchError(ValueError):
+    """index.jsonl satır sayısı index_tf.npz satır sayısıyla uyuşmuyor."""
+
+
+def _read_index() -> Tuple[List[DocChunk], csr_matrix, Dict[str, int]]:
+    with np.load(TF_PATH, allow_pickle=False) as z:
+        tf = csr_matrix((z["data"], z["indices"], z["indptr"]), shape=tuple(z["shape"]))
+        vocab = {t: i for i, t in enumerate(z["vocab"].tolist())}
+
     chunks: List[DocChunk] = []
-    for o in payload:
-        chunks.append(DocChunk(
-            id=o["id"],
-            source=o["source"],
-            text=o["text"],
-            tf=o.get("tf", {}),
-            norm=float(o.get("norm", 1.0)),
-        ))
-    return chunks
-
-
-def cosine_sim(q_tf: Dict[str, float], q_norm: float, d_tf: Dict[str, float], d_norm: float) -> float:
-    dot = 0.0
-    for t, v in q_tf.items():
-        dot += v * d_tf.get(t, 0.0)
-    return dot / (q_norm * d_norm)
+    with open(INDEX_PATH, "rb") as f:
+        for line in f:
+            o = _json_loads(line)
+            chunks.append(DocChunk(id=o["id"], source=o["source"], text=o["text"]))
+
+    if len(chunks) != tf.shape[0]:
+        raise IndexMismatchError(
+            f"{INDEX_PATH.name} has {len(chunks)} chunks but {TF_PATH.name} has {tf.shape[0]} rows"
+        )
+    return chunks, tf, vocab
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    En yüksek k skorun index'leri, skor azalan (eşitlikte chunk sırası, stable sort ile aynı).
+    Seçim O(N) partition; sadece k-inci skora eşit/büyük adaylar sıralanır.
+    """
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        kth = -np.partition(-scores, k - 1)[k - 1]
+        top = np.flatnonzero(scores >= kth)
+    else:
+        top = np.arange(n)
+    return top[np.lexsort((top, -scores[top]))][:k]
 
 
 def retrieve(query: str, k: int = 5) -> List[Dict[str, str]]:
-    chunks = load_index()
+    index = _load_retrieval_index()
     toks = tokenize(query)
-    q_tf: Dict[str, float] = {}
-    for t in toks:
-        q_tf[t] = q_tf.get(t, 0.0) + 1.0
-    q_norm = math.sqrt(sum(v * v for v in q_tf.values())) or 1.0
-
-    scored: List[Tuple[float, DocChunk]] = []
-    for ch in chunks:
-        s = cosine_sim(q_tf, q_norm, ch.tf, ch.norm)
-        if s > 0:
-            scored.append((s, ch))
-
-    scored.sort(key=lambda x: x[0], reverse=True)
+    q_tf = Counter(toks)
+
+    # sorgu terim sayıları (vocab dışı terimler skora katkı vermez)
+    cols: List[int] = []
+    counts: List[float] = []
+    for t, v in q_tf.items():
+        j = index.vocab.get(t)
+        if j is not None:
+            cols.append(j)
+            counts.append(v)
+    if not cols:
+        return []
+
+    # adaylar: en az bir sorgu terimini içeren chunk'lar (diğerlerinin skoru 0)
+    sub = index.postings[:, cols]
+    cand = np.unique(sub.indices)
+    scores = (sub @ np.asarray(counts, dtype=np.float64))[cand]
+    order = _top_k(scores, k)
+
     out: List[Dict[str, str]] = []
-    for s, ch in scored[:k]:
+    for r in order.tolist():
+        s = float(scores[r])
+        if s <= 0:
+            break
+        ch = index.chunks[int(cand[r])]
         out.append({
             "id": ch.id,
             "source": ch.source,